@@ -3,19 +3,52 @@ Generate realistic example datasets for survival credit modeling.
 Creates training and test data with typical loan performance patterns.
 """
 
+import zlib
 import pandas as pd
 import numpy as np
 from typing import Dict, List
 
+from survival_credit_model import SegmentArrays, roll_balances, write_csv
+
 
 class LoanDataGenerator:
     """
     Generates realistic loan performance data for testing survival credit models.
     """
     
+    # Hazard rate patterns by segment type
+    HAZARD_PATTERNS = {
+        'prime': {
+            'payment_base': 0.08,      # 8% monthly payment rate
+            'payment_decay': 0.001,    # Slight decay over time
+            'chargeoff_base': 0.005,   # 0.5% monthly chargeoff rate
+            'chargeoff_peak': 6,       # Peak chargeoffs around month 6
+            'chargeoff_decay': 0.02    # Faster decay after peak
+        },
+        'near_prime': {
+            'payment_base': 0.09,
+            'payment_decay': 0.0015,
+            'chargeoff_base': 0.012,
+            'chargeoff_peak': 8,
+            'chargeoff_decay': 0.025
+        },
+        'subprime': {
+            'payment_base': 0.11,
+            'payment_decay': 0.002,
+            'chargeoff_base': 0.025,
+            'chargeoff_peak': 4,
+            'chargeoff_decay': 0.03
+        }
+    }
+    
     def __init__(self, random_seed: int = 42):
-        np.random.seed(random_seed)
+        # Each segment draws noise from its own PCG64 stream keyed by this seed's
+        # entropy and the segment ID, so a segment's data is reproducible for a
+        # given random_seed regardless of which other segments are generated
+        # with it, and the global np.random state is neither used nor changed
+        self.seed_sequence = np.random.SeedSequence(random_seed)
         self.random_seed = random_seed
+        self._segment_type_cache: Dict[str, str] = {}
     
     def generate_training_data(self, 
                              segments: List[str] = None,
@@ -43,18 +76,12 @@ class LoanDataGenerator:
                 'Subprime_Auto_2021Q1': 3_000_000
             }
         
-        all_data = []
-        
-        for segment in segments:
-            segment_data = self._generate_segment_data(
-                segment_id=segment,
-                max_months=max_months,
-                origination_amount=origination_amounts[segment],
-                segment_type=self._get_segment_type(segment)
-            )
-            all_data.append(segment_data)
-        
-        return pd.concat(all_data, ignore_index=True)
+        return self._generate_segments_data(
+            segment_ids=segments,
+            max_months=max_months,
+            origination_amounts=[origination_amounts[segment] for segment in segments],
+            segment_types=[self._get_segment_type(segment) for segment in segments]
+        ).to_frame()
     
     def generate_test_data(self,
                           segment_id: str = 'Prime_Auto_2023Q1',
@@ -79,113 +106,127 @@ class LoanDataGenerator:
             max_months=known_months,
             origination_amount=origination_amount,
             segment_type=segment_type
-        )
+        ).to_frame()
     
     def _generate_segment_data(self,
                               segment_id: str,
                               max_months: int,
                               origination_amount: float,
-                              segment_type: str) -> pd.DataFrame:
+                              segment_type: str) -> SegmentArrays:
         """
         Generate data for a single segment with realistic payment/chargeoff patterns.
         """
+        return self._generate_segments_data(
+            segment_ids=[segment_id],
+            max_months=max_months,
+            origination_amounts=[origination_amount],
+            segment_types=[segment_type]
+        )
+    
+    def _generate_segments_data(self,
+                               segment_ids: List[str],
+                               max_months: int,
+                               origination_amounts: List[float],
+                               segment_types: List[str]) -> SegmentArrays:
+        """
+        Generate data for several segments at once.
         
-        # Define hazard rate patterns by segment type
-        hazard_patterns = {
-            'prime': {
-                'payment_base': 0.08,      # 8% monthly payment rate
-                'payment_decay': 0.001,    # Slight decay over time
-                'chargeoff_base': 0.005,   # 0.5% monthly chargeoff rate
-                'chargeoff_peak': 6,       # Peak chargeoffs around month 6
-                'chargeoff_decay': 0.02    # Faster decay after peak
-            },
-            'near_prime': {
-                'payment_base': 0.09,
-                'payment_decay': 0.0015,
-                'chargeoff_base': 0.012,
-                'chargeoff_peak': 8,
-                'chargeoff_decay': 0.025
-            },
-            'subprime': {
-                'payment_base': 0.11,
-                'payment_decay': 0.002,
-                'chargeoff_base': 0.025,
-                'chargeoff_peak': 4,
-                'chargeoff_decay': 0.03
-            }
-        }
+        Rates and balances are computed as (segments x months) arrays, so the
+        work is a handful of broadcasted NumPy operations regardless of how
+        many segments are requested.
+        """
         
-        pattern = hazard_patterns.get(segment_type, hazard_patterns['prime'])
+        patterns = [
+            self.HAZARD_PATTERNS.get(segment_type, self.HAZARD_PATTERNS['prime'])
+            for segment_type in segment_types
+        ]
         
-        data_rows = []
-        current_balance = origination_amount
+        def pattern_column(key: str) -> np.ndarray:
+            return np.array([pattern[key] for pattern in patterns], dtype=float)[:, None]
         
-        for month in range(max_months + 1):
-            # Calculate payment hazard rate (declining over time)
-            payment_rate = pattern['payment_base'] * (1 - pattern['payment_decay'] * month)
-            payment_rate = max(0.02, payment_rate)  # Floor at 2%
-            
-            # Calculate chargeoff hazard rate (peaks early, then declines)
-            if month <= pattern['chargeoff_peak']:
-                chargeoff_rate = pattern['chargeoff_base'] * (1 + 0.5 * month / pattern['chargeoff_peak'])
-            else:
-                decay_factor = np.exp(-pattern['chargeoff_decay'] * (month - pattern['chargeoff_peak']))
-                chargeoff_rate = pattern['chargeoff_base'] * (1 + 0.5) * decay_factor
-            
-            chargeoff_rate = max(0.001, chargeoff_rate)  # Floor at 0.1%
-            
-            # Add some random noise
-            payment_rate *= (1 + np.random.normal(0, 0.1))
-            chargeoff_rate *= (1 + np.random.normal(0, 0.15))
-            
-            # Ensure rates are reasonable
-            payment_rate = np.clip(payment_rate, 0.01, 0.20)
-            chargeoff_rate = np.clip(chargeoff_rate, 0.001, 0.05)
-            
-            # Calculate dollar amounts
-            payment_amount = current_balance * payment_rate
-            chargeoff_amount = current_balance * chargeoff_rate
-            
-            # Ensure we don't exceed available balance
-            total_outflow = payment_amount + chargeoff_amount
-            if total_outflow > current_balance:
-                scale_factor = current_balance / total_outflow
-                payment_amount *= scale_factor
-                chargeoff_amount *= scale_factor
-            
-            # Create data row
-            row = {
-                'segment_id': segment_id,
-                'month_on_book': month,
-                'outstanding_balance': current_balance,
-                'payments': payment_amount,
-                'chargeoffs': chargeoff_amount
-            }
-            
-            data_rows.append(row)
-            
-            # Update balance for next month
-            current_balance = current_balance - payment_amount - chargeoff_amount
-            current_balance = max(0, current_balance)
-            
-            # Stop if balance is essentially zero
-            if current_balance < origination_amount * 0.001:  # 0.1% of original
-                break
+        origination = np.asarray(origination_amounts, dtype=float)[:, None]
+        months = np.arange(max_months + 1)[None, :]
+        
+        # Calculate payment hazard rate (declining over time), floored at 2%
+        payment_rate = np.maximum(
+            0.02, pattern_column('payment_base') * (1 - pattern_column('payment_decay') * months)
+        )
+        
+        # Calculate chargeoff hazard rate (peaks early, then declines), floored at 0.1%
+        chargeoff_base = pattern_column('chargeoff_base')
+        peak = pattern_column('chargeoff_peak')
+        chargeoff_rate = np.where(
+            months <= peak,
+            chargeoff_base * (1 + 0.5 * months / peak),
+            chargeoff_base * (1 + 0.5) * np.exp(-pattern_column('chargeoff_decay') * (months - peak))
+        )
+        chargeoff_rate = np.maximum(0.001, chargeoff_rate)
         
-        return pd.DataFrame(data_rows)
+        # Add some random noise, drawn from an independent stream per segment
+        segment_rngs = [
+            np.random.default_rng([self.seed_sequence.entropy, zlib.crc32(segment_id.encode())])
+            for segment_id in segment_ids
+        ]
+        noise = np.stack([rng.standard_normal((2, months.size)) for rng in segment_rngs], axis=1)
+        payment_rate = payment_rate * (1 + 0.1 * noise[0])
+        chargeoff_rate = chargeoff_rate * (1 + 0.15 * noise[1])
+        
+        # Ensure rates are reasonable. The clipped rates sum to at most 25%, so
+        # outflows never exceed the available balance.
+        payment_rate = np.clip(payment_rate, 0.01, 0.20)
+        chargeoff_rate = np.clip(chargeoff_rate, 0.001, 0.05)
+        
+        # Roll each segment's balance forward, stopping once balance falls
+        # below 0.1% of original
+        rolled = [
+            roll_balances(payment_rate[i], chargeoff_rate[i], origination[i, 0], origination[i, 0] * 0.001)
+            for i in range(len(segment_ids))
+        ]
+        n_rows = np.array([n_active for _, _, _, n_active in rolled])
+        offsets = np.concatenate(([0], np.cumsum(n_rows)))
+        
+        # Fill preallocated output columns segment by segment
+        month_on_book = np.empty(offsets[-1], dtype=months.dtype)
+        outstanding_balance = np.empty(offsets[-1])
+        payments = np.empty(offsets[-1])
+        chargeoffs = np.empty(offsets[-1])
+        
+        for (segment_balances, segment_payments, segment_chargeoffs, n), start, end in zip(
+                rolled, offsets[:-1], offsets[1:]):
+            month_on_book[start:end] = months[0, :n]
+            outstanding_balance[start:end] = segment_balances[:n]
+            payments[start:end] = segment_payments[:n]
+            chargeoffs[start:end] = segment_chargeoffs[:n]
+        
+        return SegmentArrays(
+            segment_id=np.repeat(np.asarray(segment_ids, dtype=object), n_rows),
+            month_on_book=month_on_book,
+            outstanding_balance=outstanding_balance,
+            payments=payments,
+            chargeoffs=chargeoffs
+        )
     
     def _get_segment_type(self, segment_id: str) -> str:
         """Extract segment type from segment ID."""
+        if segment_id in self._segment_type_cache:
+            return self._segment_type_cache[segment_id]
+        
         segment_lower = segment_id.lower()
+        has_sub = 'sub' in segment_lower
+        has_near = 'near' in segment_lower
+        has_prime = 'prime' in segment_lower
         
-        if 'prime' in segment_lower and 'sub' not in segment_lower:
-            return 'prime'
-        elif 'near' in segment_lower or 'near_prime' in segment_lower:
-            return 'near_prime'
-        elif 'sub' in segment_lower:
-            return 'subprime'
+        if has_prime and not has_sub:
+            segment_type = 'prime'
+        elif has_near:
+            segment_type = 'near_prime'
+        elif has_sub:
+            segment_type = 'subprime'
         else:
-            return 'prime'  # Default
+            segment_type = 'prime'  # Default
+        
+        self._segment_type_cache[segment_id] = segment_type
+        return segment_type
     
     def save_datasets(self, output_dir: str = '.'):
         """Generate and save example training and test datasets."""
@@ -193,12 +234,12 @@ class LoanDataGenerator:
         # Generate training data
         training_data = self.generate_training_data()
         training_file = f"{output_dir}/training_data_example.csv"
-        training_data.to_csv(training_file, index=False)
+        write_csv(training_data, training_file)
         
         # Generate test data
         test_data = self.generate_test_data()
         test_file = f"{output_dir}/test_data_example.csv"
-        test_data.to_csv(test_file, index=False)
+        write_csv(test_data, test_file)
         
         return {
             'training_file': training_file,
@@ -229,8 +270,8 @@ def generate_example_datasets():
     )
     
     # Save to files
-    training_data.to_csv('training_data_example.csv', index=False)
-    test_data.to_csv('test_data_example.csv', index=False)
+    write_csv(training_data, 'training_data_example.csv')
+    write_csv(test_data, 'test_data_example.csv')
     
     print(f"Training data: {training_data.shape[0]} rows, {training_data.shape[1]} columns")
     print(f"Test data: {test_data.shape[0]} rows, {test_data.shape[1]} columns")
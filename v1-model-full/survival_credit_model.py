@@ -5,9 +5,267 @@ Simplified hazard rate modeling focusing on payment and chargeoff curves
 
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Tuple, Optional
+from dataclasses import dataclass, replace
+from functools import cached_property
+from typing import Dict, List, Tuple, Optional, Union
 import warnings
 
+try:
+    from numba import guvectorize, njit
+except ImportError:  # Numba is optional; the NumPy kernels are used instead
+    guvectorize = njit = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pyarrow is optional; pandas' CSV writer is used instead
+    pa = None
+
+try:
+    import xlsxwriter
+except ImportError:  # xlsxwriter is optional; pandas' default Excel engine is used instead
+    xlsxwriter = None
+
+
+def _roll_balances_numpy(payment_rates: np.ndarray, chargeoff_rates: np.ndarray,
+                         start_balance: float, min_balance: float
+                         ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """NumPy version of roll_balances, used when Numba is not installed."""
+    survival = np.maximum(1.0 - payment_rates - chargeoff_rates, 0.0)
+    balances = start_balance * np.concatenate(([1.0], np.cumprod(survival)))[:len(survival)]
+    
+    depleted = balances <= min_balance
+    n_active = int(np.argmax(depleted)) if depleted.any() else len(balances)
+    
+    return balances, balances * payment_rates, balances * chargeoff_rates, n_active
+
+
+if njit is not None:
+    @njit(cache=True)
+    def roll_balances(payment_rates, chargeoff_rates, start_balance, min_balance):
+        """
+        Roll a balance forward through monthly payment and chargeoff hazard rates.
+        
+        Each month starts from the previous month's balance less its payments and
+        chargeoffs (floored at zero). Rolling stops before the first month whose
+        starting balance is at or below min_balance.
+        
+        Returns:
+            Tuple of (balances, payments, chargeoffs, n_active); only the first
+            n_active entries of each array are meaningful
+        """
+        n_months = payment_rates.shape[0]
+        balances = np.empty(n_months)
+        payments = np.empty(n_months)
+        chargeoffs = np.empty(n_months)
+        
+        balance = start_balance
+        for t in range(n_months):
+            if balance <= min_balance:
+                return balances, payments, chargeoffs, t
+            
+            balances[t] = balance
+            payments[t] = balance * payment_rates[t]
+            chargeoffs[t] = balance * chargeoff_rates[t]
+            balance = max(0.0, balance - payments[t] - chargeoffs[t])
+        
+        return balances, payments, chargeoffs, n_months
+else:
+    roll_balances = _roll_balances_numpy
+
+
+def _roll_balances_batch_numpy(payment_rates: np.ndarray, chargeoff_rates: np.ndarray,
+                               start_balances: np.ndarray, min_balances: np.ndarray
+                               ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """NumPy version of _roll_balances_batch, used when Numba is not installed."""
+    n_months = payment_rates.shape[-1]
+    start_balances = np.asarray(start_balances, dtype=float)[..., None]
+    min_balances = np.asarray(min_balances, dtype=float)[..., None]
+    
+    survival = np.maximum(1.0 - payment_rates - chargeoff_rates, 0.0)
+    cumulative = np.cumprod(survival, axis=-1)
+    balances = start_balances * np.concatenate(
+        (np.ones(cumulative.shape[:-1] + (1,)), cumulative), axis=-1
+    )[..., :n_months]
+    
+    # Zero out every month from the first one at or below the minimum balance
+    active = np.logical_and.accumulate(balances > min_balances, axis=-1)
+    balances = np.where(active, balances, 0.0)
+    
+    return balances, balances * payment_rates, balances * chargeoff_rates
+
+
+if guvectorize is not None:
+    @guvectorize(['void(f8[:], f8[:], f8, f8, f8[:], f8[:], f8[:])'],
+                 '(n),(n),(),()->(n),(n),(n)', target='parallel', nopython=True, cache=True)
+    def _roll_balances_batch(payment_rates, chargeoff_rates, start_balance, min_balance,
+                             balances, payments, chargeoffs):
+        """
+        Batched roll_balances over the last axis, one segment per row.
+        
+        Rows are processed in parallel. Months from the first one whose starting
+        balance is at or below min_balance are written as zeros, so each row's
+        active months are its leading non-zero balances.
+        """
+        balance = start_balance
+        for t in range(payment_rates.shape[0]):
+            if balance <= min_balance:
+                balances[t] = 0.0
+                payments[t] = 0.0
+                chargeoffs[t] = 0.0
+            else:
+                balances[t] = balance
+                payments[t] = balance * payment_rates[t]
+                chargeoffs[t] = balance * chargeoff_rates[t]
+                balance = max(0.0, balance - payments[t] - chargeoffs[t])
+else:
+    _roll_balances_batch = _roll_balances_batch_numpy
+
+
+def _pyarrow_csv_compatible(df: pd.DataFrame) -> bool:
+    """Whether pyarrow writes df the same way to_csv does: unique columns, all numeric/bool/string."""
+    if not df.columns.is_unique:
+        return False
+    
+    return all(
+        not isinstance(column.dtype, pd.CategoricalDtype) and (
+            (pd.api.types.is_numeric_dtype(column) and not pd.api.types.is_complex_dtype(column))
+            or pd.api.types.is_string_dtype(column)
+        )
+        for _, column in df.items()
+    )
+
+
+def write_csv(df: pd.DataFrame, file_path: str):
+    """
+    Write a DataFrame to CSV without its index, using pyarrow's writer if available.
+    
+    pyarrow is only used for frames of numeric, boolean and string columns.
+    The header comes from pandas and values are written unquoted, as to_csv
+    does; anything pyarrow cannot write that way (values needing quotes,
+    mixed-type columns, ...) is written by pandas instead. pyarrow output
+    still differs from to_csv in number and boolean formatting (10000000 vs
+    10000000.0, 1.5e-7 vs 1.5e-07, true vs True).
+    """
+    if pa is not None and _pyarrow_csv_compatible(df):
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            with open(file_path, 'wb') as f:
+                f.write(df.iloc[:0].to_csv(index=False, lineterminator='\n').encode())
+                pa_csv.write_csv(
+                    table, f,
+                    write_options=pa_csv.WriteOptions(include_header=False, quoting_style='none')
+                )
+            return
+        except (pa.ArrowException, ValueError, TypeError):
+            pass  # Rewrite the whole file with pandas below
+    
+    df.to_csv(file_path, index=False, lineterminator='\n')
+
+
+def _balance_reciprocal(balances: np.ndarray) -> np.ndarray:
+    """1 / balance, or zero where the balance is not positive."""
+    return np.divide(1.0, balances, out=np.zeros(len(balances)), where=balances > 0)
+
+
+def _centered_rolling_mean(values: np.ndarray, window: int) -> np.ndarray:
+    """
+    Centered rolling mean that averages over partial windows at the edges.
+    
+    Equivalent to pandas rolling(window, center=True, min_periods=1).mean():
+    NaN values are skipped, and a window with no values gives NaN. Computed
+    from cumulative sums of the values and of the value counts.
+    """
+    n_values = len(values)
+    present = ~np.isnan(values)
+    cumulative = np.concatenate(([0.0], np.cumsum(np.where(present, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(present)))
+    
+    positions = np.arange(n_values)
+    lower = np.maximum(positions - window // 2, 0)
+    upper = np.minimum(positions + (window - 1) // 2 + 1, n_values)
+    
+    window_counts = counts[upper] - counts[lower]
+    return np.divide(cumulative[upper] - cumulative[lower], window_counts,
+                     out=np.full(n_values, np.nan), where=window_counts > 0)
+
+
+@dataclass
+class SegmentArrays:
+    """
+    Loan flow data held as one NumPy array per column.
+    
+    Pipeline stages pass this between each other so that DataFrames are only
+    built at the public API boundary. All arrays have one entry per row;
+    segment_id is None for data without segment identifiers.
+    """
+    
+    segment_id: Optional[np.ndarray]
+    month_on_book: np.ndarray
+    outstanding_balance: np.ndarray
+    payments: np.ndarray
+    chargeoffs: np.ndarray
+    forecast_flag: Optional[np.ndarray] = None
+    
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'SegmentArrays':
+        """Build from a DataFrame with the flow columns (segment_id and forecast_flag are optional)."""
+        return cls(
+            segment_id=df['segment_id'].to_numpy() if 'segment_id' in df.columns else None,
+            month_on_book=df['month_on_book'].to_numpy(),
+            outstanding_balance=df['outstanding_balance'].to_numpy(),
+            payments=df['payments'].to_numpy(),
+            chargeoffs=df['chargeoffs'].to_numpy(),
+            forecast_flag=df['forecast_flag'].to_numpy() if 'forecast_flag' in df.columns else None
+        )
+    
+    def to_frame(self) -> pd.DataFrame:
+        """Convert to a DataFrame with one column per field."""
+        columns = {} if self.segment_id is None else {'segment_id': self.segment_id}
+        columns.update({
+            'month_on_book': self.month_on_book,
+            'outstanding_balance': self.outstanding_balance,
+            'payments': self.payments,
+            'chargeoffs': self.chargeoffs
+        })
+        if self.forecast_flag is not None:
+            columns['forecast_flag'] = self.forecast_flag
+        
+        return pd.DataFrame(columns)
+    
+    def take(self, indices: np.ndarray) -> 'SegmentArrays':
+        """Select rows by position."""
+        return SegmentArrays(
+            segment_id=None if self.segment_id is None else self.segment_id[indices],
+            month_on_book=self.month_on_book[indices],
+            outstanding_balance=self.outstanding_balance[indices],
+            payments=self.payments[indices],
+            chargeoffs=self.chargeoffs[indices],
+            forecast_flag=None if self.forecast_flag is None else self.forecast_flag[indices]
+        )
+    
+    def append(self, other: 'SegmentArrays') -> 'SegmentArrays':
+        """Rows of self followed by the rows of other."""
+        def join(a, b):
+            return None if a is None or b is None else np.concatenate((a.astype(object), b.astype(object)))
+        
+        return SegmentArrays(
+            segment_id=join(self.segment_id, other.segment_id),
+            month_on_book=np.concatenate((self.month_on_book, other.month_on_book)),
+            outstanding_balance=np.concatenate((self.outstanding_balance, other.outstanding_balance)),
+            payments=np.concatenate((self.payments, other.payments)),
+            chargeoffs=np.concatenate((self.chargeoffs, other.chargeoffs)),
+            forecast_flag=join(self.forecast_flag, other.forecast_flag)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.month_on_book)
+    
+    @cached_property
+    def inv_balance(self) -> np.ndarray:
+        """Reciprocal of outstanding_balance (zero where not positive), shared by rate calculations."""
+        return _balance_reciprocal(self.outstanding_balance)
+
 
 class DataValidator:
     """
@@ -25,12 +283,12 @@ class DataValidator:
     def __init__(self):
         self.validation_results = {}
     
-    def validate_data(self, df: pd.DataFrame) -> Dict:
+    def validate_data(self, data: Union[pd.DataFrame, SegmentArrays]) -> Dict:
         """
         Validate input data structure and business logic.
         
         Args:
-            df: Input DataFrame with loan flow data
+            data: Input DataFrame or SegmentArrays with loan flow data
             
         Returns:
             Dictionary with validation results
@@ -42,45 +300,53 @@ class DataValidator:
             'summary': {}
         }
         
-        # Check required columns
-        missing_cols = set(self.REQUIRED_COLUMNS) - set(df.columns)
-        if missing_cols:
+        if isinstance(data, pd.DataFrame):
+            # Check required columns
+            missing_cols = set(self.REQUIRED_COLUMNS) - set(data.columns)
+            if missing_cols:
+                results['valid'] = False
+                results['errors'].append(f"Missing required columns: {missing_cols}")
+                return results
+            
+            data = SegmentArrays.from_frame(data)
+        elif data.segment_id is None:
+            # SegmentArrays hold every other required column by construction
             results['valid'] = False
-            results['errors'].append(f"Missing required columns: {missing_cols}")
+            results['errors'].append("Missing required columns: {'segment_id'}")
             return results
         
         # Check data types and ranges
-        self._check_data_quality(df, results)
+        self._check_data_quality(data, results)
         
         # Check business logic
-        self._check_business_logic(df, results)
+        self._check_business_logic(data, results)
         
         # Check completeness
-        self._check_completeness(df, results)
+        self._check_completeness(data, results)
         
         return results
     
-    def _check_data_quality(self, df: pd.DataFrame, results: Dict):
+    def _check_data_quality(self, data: SegmentArrays, results: Dict):
         """Validate data types and reasonable ranges."""
         
         # Month on book should be non-negative integers
-        if df['month_on_book'].min() < 0:
+        if (data.month_on_book < 0).any():
             results['errors'].append("month_on_book cannot be negative")
         
         # Outstanding balance should be positive
-        if (df['outstanding_balance'] <= 0).any():
+        if (data.outstanding_balance <= 0).any():
             results['warnings'].append("Zero or negative outstanding_balance detected")
         
         # Payments and chargeoffs should be non-negative
-        if (df['payments'] < 0).any():
+        if (data.payments < 0).any():
             results['errors'].append("Negative payments detected")
         
-        if (df['chargeoffs'] < 0).any():
+        if (data.chargeoffs < 0).any():
             results['errors'].append("Negative chargeoffs detected")
         
         # Check hazard rates are reasonable (0-100%)
-        payment_rates = df['payments'] / df['outstanding_balance']
-        chargeoff_rates = df['chargeoffs'] / df['outstanding_balance']
+        payment_rates = data.payments * data.inv_balance
+        chargeoff_rates = data.chargeoffs * data.inv_balance
         
         if (payment_rates > 1.0).any():
             results['warnings'].append("Payment rates > 100% detected")
@@ -88,49 +354,74 @@ class DataValidator:
         if (chargeoff_rates > 1.0).any():
             results['warnings'].append("Chargeoff rates > 100% detected")
     
-    def _check_business_logic(self, df: pd.DataFrame, results: Dict):
+    def _sort_by_segment(self, data: SegmentArrays) -> Tuple[SegmentArrays, np.ndarray, pd.Index]:
+        """
+        Sort rows by segment (in order of first appearance), then by month.
+        
+        Returns:
+            Tuple of (sorted data, sorted segment codes, segment ids by code)
+        """
+        segment_codes, segment_ids = pd.factorize(data.segment_id)
+        order = np.lexsort((data.month_on_book, segment_codes))
+        
+        return data.take(order), segment_codes[order], segment_ids
+    
+    def _check_business_logic(self, data: SegmentArrays, results: Dict):
         """Validate business logic consistency."""
         
-        # Check balance flow consistency for each segment
-        for segment_id in df['segment_id'].unique():
-            segment_df = df[df['segment_id'] == segment_id].sort_values('month_on_book')
-            
-            # Calculate implied next month balance
-            segment_df = segment_df.copy()
-            segment_df['implied_next_balance'] = (
-                segment_df['outstanding_balance'] - 
-                segment_df['payments'] - 
-                segment_df['chargeoffs']
+        sorted_data, segment_codes, segment_ids = self._sort_by_segment(data)
+        
+        # Calculate implied next month balance
+        implied_next_balance = (
+            sorted_data.outstanding_balance - 
+            sorted_data.payments - 
+            sorted_data.chargeoffs
+        )
+        
+        # Check if it matches actual next month within the same segment (with tolerance)
+        same_segment = segment_codes[:-1] == segment_codes[1:]
+        inconsistent = same_segment & (
+            np.abs(implied_next_balance[:-1] - sorted_data.outstanding_balance[1:]) > 0.01  # $0.01 tolerance
+        )
+        
+        # Only report first inconsistency per segment
+        inconsistent_rows = np.flatnonzero(inconsistent)
+        _, first = np.unique(segment_codes[inconsistent_rows], return_index=True)
+        
+        for row in inconsistent_rows[first]:
+            results['warnings'].append(
+                f"Balance flow inconsistency in segment {segment_ids[segment_codes[row]]} "
+                f"at month {sorted_data.month_on_book[row]}"
             )
-            
-            # Check if it matches actual next month (with tolerance)
-            for i in range(len(segment_df) - 1):
-                current_implied = segment_df.iloc[i]['implied_next_balance']
-                next_actual = segment_df.iloc[i + 1]['outstanding_balance']
-                
-                if abs(current_implied - next_actual) > 0.01:  # $0.01 tolerance
-                    results['warnings'].append(
-                        f"Balance flow inconsistency in segment {segment_id} "
-                        f"at month {segment_df.iloc[i]['month_on_book']}"
-                    )
-                    break  # Only report first inconsistency per segment
-    
-    def _check_completeness(self, df: pd.DataFrame, results: Dict):
+    
+    def _check_completeness(self, data: SegmentArrays, results: Dict):
         """Check for missing months within each segment."""
         
-        for segment_id in df['segment_id'].unique():
-            segment_df = df[df['segment_id'] == segment_id]
-            months = sorted(segment_df['month_on_book'].unique())
+        if len(data) == 0:
+            return
+        
+        sorted_data, segment_codes, segment_ids = self._sort_by_segment(data)
+        months = sorted_data.month_on_book
+        
+        # Row ranges of each segment in the sorted data
+        new_segment = np.concatenate(([True], segment_codes[1:] != segment_codes[:-1]))
+        starts = np.flatnonzero(new_segment)
+        ends = np.append(starts[1:], len(months))
+        
+        # A segment has gaps when its month range is wider than its distinct months
+        new_month = new_segment | np.concatenate(([True], months[1:] != months[:-1]))
+        distinct_months = np.add.reduceat(new_month, starts)
+        has_gaps = months[ends - 1] - months[starts] + 1 != distinct_months
+        
+        # Only build the month sets for segments with gaps
+        for start, end in zip(starts[has_gaps], ends[has_gaps]):
+            segment_months = months[start:end]
+            expected_months = range(segment_months[0], segment_months[-1] + 1)
+            missing_months = set(expected_months) - set(segment_months)
             
-            # Check for gaps in month sequence
-            if months:
-                expected_months = list(range(min(months), max(months) + 1))
-                missing_months = set(expected_months) - set(months)
-                
-                if missing_months:
-                    results['warnings'].append(
-                        f"Missing months in segment {segment_id}: {missing_months}"
-                    )
+            results['warnings'].append(
+                f"Missing months in segment {segment_ids[segment_codes[start]]}: {missing_months}"
+            )
 
 
 class HazardRateEstimator:
@@ -141,41 +432,54 @@ class HazardRateEstimator:
     def __init__(self, smoothing_window: int = 3):
         self.smoothing_window = smoothing_window
         self.hazard_curves = {}
+        
+        # Sorted month/rate arrays backing vectorized lookups
+        self._months_arr = np.array([])
+        self._pay_arr = np.array([])
+        self._co_arr = np.array([])
     
-    def fit(self, df: pd.DataFrame) -> Dict:
+    def fit(self, data: Union[pd.DataFrame, SegmentArrays]) -> Dict:
         """
         Estimate hazard rate curves from training data.
         
         Args:
-            df: Training data with payment/chargeoff flows
+            data: Training DataFrame or SegmentArrays with payment/chargeoff flows
             
         Returns:
             Dictionary containing estimated hazard rate curves
         """
         
-        # Aggregate across all segments by month_on_book
-        agg_df = df.groupby('month_on_book').agg({
-            'outstanding_balance': 'sum',
-            'payments': 'sum',
-            'chargeoffs': 'sum'
-        }).reset_index()
+        if isinstance(data, pd.DataFrame):
+            data = SegmentArrays.from_frame(data)
+        
+        # Aggregate across all segments by month_on_book (sorted by month)
+        months, month_index = np.unique(data.month_on_book, return_inverse=True)
         
-        # Calculate hazard rates
-        agg_df['payment_hazard_rate'] = agg_df['payments'] / agg_df['outstanding_balance']
-        agg_df['chargeoff_hazard_rate'] = agg_df['chargeoffs'] / agg_df['outstanding_balance']
+        def month_totals(values: np.ndarray) -> np.ndarray:
+            # Skip missing values, as groupby().sum() does
+            values = np.where(np.isnan(values), 0.0, values)
+            return np.bincount(month_index, weights=values, minlength=len(months))
         
-        # Handle division by zero
-        agg_df['payment_hazard_rate'] = agg_df['payment_hazard_rate'].fillna(0)
-        agg_df['chargeoff_hazard_rate'] = agg_df['chargeoff_hazard_rate'].fillna(0)
+        agg_df = pd.DataFrame({
+            'month_on_book': months,
+            'outstanding_balance': month_totals(data.outstanding_balance),
+            'payments': month_totals(data.payments),
+            'chargeoffs': month_totals(data.chargeoffs)
+        })
+        
+        # Calculate hazard rates (zero where there is no balance)
+        inv_balance = _balance_reciprocal(agg_df['outstanding_balance'].to_numpy())
+        agg_df['payment_hazard_rate'] = agg_df['payments'].to_numpy() * inv_balance
+        agg_df['chargeoff_hazard_rate'] = agg_df['chargeoffs'].to_numpy() * inv_balance
         
         # Apply smoothing if requested
         if self.smoothing_window > 1:
-            agg_df['payment_hazard_rate_smoothed'] = agg_df['payment_hazard_rate'].rolling(
-                window=self.smoothing_window, center=True, min_periods=1
-            ).mean()
-            agg_df['chargeoff_hazard_rate_smoothed'] = agg_df['chargeoff_hazard_rate'].rolling(
-                window=self.smoothing_window, center=True, min_periods=1
-            ).mean()
+            agg_df['payment_hazard_rate_smoothed'] = _centered_rolling_mean(
+                agg_df['payment_hazard_rate'].to_numpy(), self.smoothing_window
+            )
+            agg_df['chargeoff_hazard_rate_smoothed'] = _centered_rolling_mean(
+                agg_df['chargeoff_hazard_rate'].to_numpy(), self.smoothing_window
+            )
         else:
             agg_df['payment_hazard_rate_smoothed'] = agg_df['payment_hazard_rate']
             agg_df['chargeoff_hazard_rate_smoothed'] = agg_df['chargeoff_hazard_rate']
@@ -187,12 +491,19 @@ class HazardRateEstimator:
             'training_data': agg_df
         }
         
+        # Cache curves as sorted arrays for vectorized lookups
+        self._months_arr = agg_df['month_on_book'].to_numpy()
+        self._pay_arr = agg_df['payment_hazard_rate_smoothed'].to_numpy()
+        self._co_arr = agg_df['chargeoff_hazard_rate_smoothed'].to_numpy()
+        
         return self.hazard_curves
     
     def get_hazard_rate(self, month: int, hazard_type: str) -> float:
         """
         Get hazard rate for specific month on book.
         
+        Deprecated: use get_hazard_rates, which looks up many months in one call.
+        
         Args:
             month: Month on book
             hazard_type: 'payment' or 'chargeoff'
@@ -200,40 +511,43 @@ class HazardRateEstimator:
         Returns:
             Hazard rate for the given month
         """
+        warnings.warn(
+            "get_hazard_rate is deprecated; use get_hazard_rates instead",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        return float(self.get_hazard_rates(np.array([month]), hazard_type)[0])
+    
+    def get_hazard_rates(self, months: np.ndarray, hazard_type: str) -> np.ndarray:
+        """
+        Get hazard rates for an array of months on book.
+        
+        Rates are linearly interpolated between trained months; months outside
+        the trained range use the nearest trained rate.
+        
+        Args:
+            months: Array of months on book
+            hazard_type: 'payment' or 'chargeoff'
+            
+        Returns:
+            Array of hazard rates aligned with months
+        """
         if not self.hazard_curves:
             raise ValueError("Model must be fitted first")
         
-        curve_key = f"{hazard_type}_hazard"
-        if curve_key not in self.hazard_curves:
+        if hazard_type == 'payment':
+            rates = self._pay_arr
+        elif hazard_type == 'chargeoff':
+            rates = self._co_arr
+        else:
             raise ValueError(f"Invalid hazard_type: {hazard_type}")
         
-        rates = self.hazard_curves[curve_key]
-        
-        # Return exact rate if available
-        if month in rates:
-            return rates[month]
+        months = np.asarray(months, dtype=float)
         
-        # Otherwise interpolate or extrapolate
-        available_months = sorted(rates.keys())
+        if self._months_arr.size == 0:
+            return np.zeros(months.shape)
         
-        if not available_months:
-            return 0.0
-        
-        if month < min(available_months):
-            return rates[min(available_months)]
-        elif month > max(available_months):
-            # Use last available rate for extrapolation
-            return rates[max(available_months)]
-        else:
-            # Linear interpolation
-            lower_month = max([m for m in available_months if m <= month])
-            upper_month = min([m for m in available_months if m >= month])
-            
-            if lower_month == upper_month:
-                return rates[lower_month]
-            
-            weight = (month - lower_month) / (upper_month - lower_month)
-            return rates[lower_month] * (1 - weight) + rates[upper_month] * weight
+        return np.interp(months, self._months_arr, rates)
 
 
 class CurveTransferEngine:
@@ -244,12 +558,12 @@ class CurveTransferEngine:
     def __init__(self, rate_estimator: HazardRateEstimator):
         self.rate_estimator = rate_estimator
     
-    def validate_known_actuals(self, df: pd.DataFrame) -> Dict:
+    def validate_known_actuals(self, actuals: Union[pd.DataFrame, SegmentArrays]) -> Dict:
         """
         Compare known actuals against trained curves.
         
         Args:
-            df: DataFrame with known actual performance
+            actuals: DataFrame or SegmentArrays with known actual performance
             
         Returns:
             Validation results comparing actuals vs expected curves
@@ -260,47 +574,52 @@ class CurveTransferEngine:
             'warnings': []
         }
         
-        for _, row in df.iterrows():
-            month = row['month_on_book']
-            
-            # Get expected rates from trained curves
-            expected_payment_rate = self.rate_estimator.get_hazard_rate(month, 'payment')
-            expected_chargeoff_rate = self.rate_estimator.get_hazard_rate(month, 'chargeoff')
-            
-            # Calculate actual rates
-            actual_payment_rate = row['payments'] / row['outstanding_balance']
-            actual_chargeoff_rate = row['chargeoffs'] / row['outstanding_balance']
-            
-            # Calculate variances
-            payment_variance = actual_payment_rate - expected_payment_rate
-            chargeoff_variance = actual_chargeoff_rate - expected_chargeoff_rate
-            
-            comparison = {
-                'month_on_book': month,
-                'expected_payment_rate': expected_payment_rate,
-                'actual_payment_rate': actual_payment_rate,
-                'payment_variance': payment_variance,
-                'expected_chargeoff_rate': expected_chargeoff_rate,
-                'actual_chargeoff_rate': actual_chargeoff_rate,
-                'chargeoff_variance': chargeoff_variance
-            }
-            
-            results['detailed_comparison'].append(comparison)
-            
-            # Flag large variances
-            if abs(payment_variance) > 0.05:  # 5% threshold
+        if isinstance(actuals, pd.DataFrame):
+            actuals = SegmentArrays.from_frame(actuals)
+        
+        months = actuals.month_on_book
+        
+        # Get expected rates from trained curves
+        expected_payment_rate = self.rate_estimator.get_hazard_rates(months, 'payment')
+        expected_chargeoff_rate = self.rate_estimator.get_hazard_rates(months, 'chargeoff')
+        
+        # Calculate actual rates
+        actual_payment_rate = actuals.payments * actuals.inv_balance
+        actual_chargeoff_rate = actuals.chargeoffs * actuals.inv_balance
+        
+        # Calculate variances
+        payment_variance = actual_payment_rate - expected_payment_rate
+        chargeoff_variance = actual_chargeoff_rate - expected_chargeoff_rate
+        
+        comparison_df = pd.DataFrame({
+            'month_on_book': months,
+            'expected_payment_rate': expected_payment_rate,
+            'actual_payment_rate': actual_payment_rate,
+            'payment_variance': payment_variance,
+            'expected_chargeoff_rate': expected_chargeoff_rate,
+            'actual_chargeoff_rate': actual_chargeoff_rate,
+            'chargeoff_variance': chargeoff_variance
+        })
+        
+        results['detailed_comparison'] = comparison_df.to_dict('records')
+        
+        # Flag large variances
+        large_payment = np.abs(payment_variance) > 0.05  # 5% threshold
+        large_chargeoff = np.abs(chargeoff_variance) > 0.02  # 2% threshold
+        
+        for i in np.flatnonzero(large_payment | large_chargeoff):
+            if large_payment[i]:
                 results['warnings'].append(
-                    f"Large payment variance at month {month}: {payment_variance:.3f}"
+                    f"Large payment variance at month {months[i]}: {payment_variance[i]:.3f}"
                 )
             
-            if abs(chargeoff_variance) > 0.02:  # 2% threshold
+            if large_chargeoff[i]:
                 results['warnings'].append(
-                    f"Large chargeoff variance at month {month}: {chargeoff_variance:.3f}"
+                    f"Large chargeoff variance at month {months[i]}: {chargeoff_variance[i]:.3f}"
                 )
         
         # Calculate summary statistics
-        if results['detailed_comparison']:
-            comparison_df = pd.DataFrame(results['detailed_comparison'])
+        if not comparison_df.empty:
             results['summary_stats'] = {
                 'mean_payment_variance': comparison_df['payment_variance'].mean(),
                 'mean_chargeoff_variance': comparison_df['chargeoff_variance'].mean(),
@@ -319,72 +638,175 @@ class ForecastGenerator:
     def __init__(self, rate_estimator: HazardRateEstimator):
         self.rate_estimator = rate_estimator
     
-    def generate_forecast(self, known_actuals: pd.DataFrame, max_month: int) -> pd.DataFrame:
+    def generate_forecast(self, known_actuals: Union[pd.DataFrame, SegmentArrays],
+                          max_month: int) -> Union[pd.DataFrame, SegmentArrays]:
         """
         Generate forecast extending known actuals using hazard rate curves.
         
         Args:
-            known_actuals: DataFrame with actual performance through current month
+            known_actuals: DataFrame or SegmentArrays with actual performance through current month
+            max_month: Maximum month on book to forecast to
+            
+        Returns:
+            Complete forecast with actual and forecasted months, sorted by month
+            and flagged via forecast_flag; same container type as known_actuals.
+            A DataFrame keeps its extra columns on the actual rows. With an
+            integer index, actual rows keep their labels and forecast rows
+            continue from max(index) + 1; any other index is replaced by a
+            fresh 0..n-1 index once forecast rows are added
+        """
+        
+        if isinstance(known_actuals, pd.DataFrame):
+            forecast_rows = self._forecast_rows(SegmentArrays.from_frame(known_actuals), max_month)
+            complete_forecast = self._append_forecast_rows(known_actuals, forecast_rows)
+            return complete_forecast.sort_values('month_on_book', kind='stable')
+        
+        complete_forecast = self._flag_actuals(known_actuals).append(
+            self._forecast_rows(known_actuals, max_month)
+        )
+        return complete_forecast.take(np.argsort(complete_forecast.month_on_book, kind='stable'))
+    
+    def generate_forecast_batch(self, known_actuals: Union[pd.DataFrame, SegmentArrays],
+                                max_month: int) -> Union[pd.DataFrame, SegmentArrays]:
+        """
+        Generate forecasts for several segments at once.
+        
+        Each segment is extended from its own last known month exactly as
+        generate_forecast would, but the balance roll-forward for all segments
+        runs as one batched kernel call over a (segments x months) grid.
+        
+        Args:
+            known_actuals: DataFrame or SegmentArrays with actual performance for one or more segments
             max_month: Maximum month on book to forecast to
             
         Returns:
-            Complete forecast DataFrame with actual and forecasted months
+            Complete forecasts sorted by segment (in order of first appearance)
+            and month; same container type as known_actuals, with DataFrame
+            columns and index handled as in generate_forecast
         """
         
-        # Start with known actuals
-        forecast_df = known_actuals.copy()
-        forecast_df['forecast_flag'] = 'Actual'
+        arrays = SegmentArrays.from_frame(known_actuals) if isinstance(known_actuals, pd.DataFrame) else known_actuals
+        
+        if arrays.segment_id is None:
+            return self.generate_forecast(known_actuals, max_month)
+        
+        segment_codes, segment_ids = pd.factorize(arrays.segment_id)
+        if len(segment_ids) <= 1:
+            return self.generate_forecast(known_actuals, max_month)
+        
+        forecast_rows, forecast_codes = self._forecast_rows_batch(arrays, segment_codes, segment_ids, max_month)
+        complete_codes = np.concatenate((segment_codes, forecast_codes))
+        
+        if isinstance(known_actuals, pd.DataFrame):
+            complete_forecast = self._append_forecast_rows(known_actuals, forecast_rows)
+            return complete_forecast.iloc[
+                np.lexsort((complete_forecast['month_on_book'].to_numpy(), complete_codes))
+            ]
         
-        # Get the last known month and ending balance
-        last_known_month = forecast_df['month_on_book'].max()
-        last_row = forecast_df[forecast_df['month_on_book'] == last_known_month].iloc[0]
+        complete_forecast = self._flag_actuals(arrays).append(forecast_rows)
+        return complete_forecast.take(np.lexsort((complete_forecast.month_on_book, complete_codes)))
+    
+    def _forecast_rows(self, known_actuals: SegmentArrays, max_month: int) -> SegmentArrays:
+        """Forecast rows extending one segment's actuals, up to max_month or until the balance runs out."""
+        
+        # Locate the (first) row for the last known month
+        last_idx = known_actuals.month_on_book.argmax()
+        last_known_month = known_actuals.month_on_book[last_idx]
         
         # Calculate ending balance for last known month
         current_balance = (
-            last_row['outstanding_balance'] - 
-            last_row['payments'] - 
-            last_row['chargeoffs']
+            known_actuals.outstanding_balance[last_idx] - 
+            known_actuals.payments[last_idx] - 
+            known_actuals.chargeoffs[last_idx]
         )
         
-        # Generate forecasts for remaining months
-        forecast_rows = []
+        # Get hazard rates from trained curves for all remaining months
+        future_months = np.arange(last_known_month + 1, max_month + 1)
+        payment_rates = self.rate_estimator.get_hazard_rates(future_months, 'payment')
+        chargeoff_rates = self.rate_estimator.get_hazard_rates(future_months, 'chargeoff')
         
-        for month in range(last_known_month + 1, max_month + 1):
-            if current_balance <= 0.01:  # Stop if balance is essentially zero
-                break
-            
-            # Get hazard rates from trained curves
-            payment_rate = self.rate_estimator.get_hazard_rate(month, 'payment')
-            chargeoff_rate = self.rate_estimator.get_hazard_rate(month, 'chargeoff')
-            
-            # Calculate dollar flows
-            payment_amount = current_balance * payment_rate
-            chargeoff_amount = current_balance * chargeoff_rate
-            
-            # Create forecast row
-            forecast_row = {
-                'segment_id': last_row['segment_id'],
-                'month_on_book': month,
-                'outstanding_balance': current_balance,
-                'payments': payment_amount,
-                'chargeoffs': chargeoff_amount,
-                'forecast_flag': 'Forecast'
-            }
-            
-            forecast_rows.append(forecast_row)
-            
-            # Update balance for next iteration
-            current_balance = current_balance - payment_amount - chargeoff_amount
-            current_balance = max(0, current_balance)  # Ensure non-negative
-        
-        # Combine actuals and forecasts
-        if forecast_rows:
-            forecast_extension = pd.DataFrame(forecast_rows)
-            complete_forecast = pd.concat([forecast_df, forecast_extension], ignore_index=True)
-        else:
-            complete_forecast = forecast_df
+        # Roll the balance forward, stopping once balance is essentially zero
+        balances, payments, chargeoffs, n_active = roll_balances(
+            payment_rates, chargeoff_rates, float(current_balance), 0.01
+        )
+        
+        return SegmentArrays(
+            segment_id=(None if known_actuals.segment_id is None
+                        else np.full(n_active, known_actuals.segment_id[last_idx], dtype=object)),
+            month_on_book=future_months[:n_active],
+            outstanding_balance=balances[:n_active],
+            payments=payments[:n_active],
+            chargeoffs=chargeoffs[:n_active],
+            forecast_flag=np.full(n_active, 'Forecast', dtype=object)
+        )
+    
+    def _forecast_rows_batch(self, known_actuals: SegmentArrays, segment_codes: np.ndarray,
+                             segment_ids: np.ndarray, max_month: int) -> Tuple[SegmentArrays, np.ndarray]:
+        """Forecast rows for every segment from one batched roll-forward, with each row's segment code."""
+        
+        # Locate the (first) row for each segment's last known month
+        months = known_actuals.month_on_book
+        order = np.lexsort((np.arange(len(months)), -months, segment_codes))
+        first_of_segment = np.concatenate(([True], segment_codes[order][1:] != segment_codes[order][:-1]))
+        last_rows = order[first_of_segment]
+        last_known_months = months[last_rows]
+        
+        # Calculate ending balance for each segment's last known month
+        start_balances = (
+            known_actuals.outstanding_balance[last_rows] - 
+            known_actuals.payments[last_rows] - 
+            known_actuals.chargeoffs[last_rows]
+        ).astype(float)
+        
+        # Future months for every segment on a shared horizon
+        n_months = max(int(max_month - last_known_months.min()), 0)
+        future_months = last_known_months[:, None] + 1 + np.arange(n_months)[None, :]
+        payment_rates = self.rate_estimator.get_hazard_rates(future_months, 'payment')
+        chargeoff_rates = self.rate_estimator.get_hazard_rates(future_months, 'chargeoff')
+        
+        # Roll all balances forward, stopping once balance is essentially zero
+        balances, payments, chargeoffs = _roll_balances_batch(
+            payment_rates, chargeoff_rates, start_balances, 0.01
+        )
+        active = (balances > 0) & (future_months <= max_month)
+        forecast_codes = np.repeat(np.arange(len(segment_ids)), active.sum(axis=1))
+        
+        forecast_rows = SegmentArrays(
+            segment_id=np.asarray(segment_ids, dtype=object)[forecast_codes],
+            month_on_book=future_months[active],
+            outstanding_balance=balances[active],
+            payments=payments[active],
+            chargeoffs=chargeoffs[active],
+            forecast_flag=np.full(len(forecast_codes), 'Forecast', dtype=object)
+        )
+        return forecast_rows, forecast_codes
+    
+    @staticmethod
+    def _flag_actuals(known_actuals: SegmentArrays) -> SegmentArrays:
+        """Known actuals with every row flagged 'Actual'."""
+        return replace(known_actuals, forecast_flag=np.full(len(known_actuals), 'Actual', dtype=object))
+    
+    @staticmethod
+    def _append_forecast_rows(known_actuals: pd.DataFrame, forecast_rows: SegmentArrays) -> pd.DataFrame:
+        """
+        Append forecast rows to a copy of the actuals, keeping its columns.
         
-        return complete_forecast.sort_values('month_on_book')
+        Integer index labels are kept, with forecast rows numbered after the
+        largest one so labels stay unique; other indexes are renumbered 0..n-1.
+        """
+        complete_forecast = known_actuals.copy()
+        complete_forecast['forecast_flag'] = 'Actual'
+        
+        if len(forecast_rows):
+            forecast_df = forecast_rows.to_frame()
+            if pd.api.types.is_integer_dtype(known_actuals.index) and len(known_actuals):
+                first_label = known_actuals.index.max() + 1
+                forecast_df.index = pd.RangeIndex(first_label, first_label + len(forecast_df))
+                complete_forecast = pd.concat([complete_forecast, forecast_df])
+            else:
+                complete_forecast = pd.concat([complete_forecast, forecast_df], ignore_index=True)
+        
+        return complete_forecast
 
 
 class OutputFormatter:
@@ -395,47 +817,52 @@ class OutputFormatter:
     def __init__(self):
         pass
     
-    def format_curves_output(self, forecast_df: pd.DataFrame, origination_amount: float) -> pd.DataFrame:
+    def format_curves_output(self, forecast: Union[pd.DataFrame, SegmentArrays],
+                             origination_amount: float) -> pd.DataFrame:
         """
         Format forecast with hazard rate curves and balance ratios.
         
         Args:
-            forecast_df: Complete forecast DataFrame
+            forecast: Complete forecast DataFrame or SegmentArrays
             origination_amount: Original loan amount for ratio calculations
             
         Returns:
             Formatted output with curves and ratios
         """
-        output_df = forecast_df.copy()
-        
-        # Calculate hazard rates
-        output_df['payment_hazard_rate'] = output_df['payments'] / output_df['outstanding_balance']
-        output_df['chargeoff_hazard_rate'] = output_df['chargeoffs'] / output_df['outstanding_balance']
-        
-        # Calculate ratios as percentage of origination
-        output_df['outstanding_balance_ratio'] = output_df['outstanding_balance'] / origination_amount
-        output_df['payments_ratio'] = output_df['payments'] / origination_amount
-        output_df['chargeoffs_ratio'] = output_df['chargeoffs'] / origination_amount
-        
-        # Select final columns
-        final_columns = [
-            'month_on_book',
-            'outstanding_balance_ratio',
-            'payments_ratio', 
-            'chargeoffs_ratio',
-            'payment_hazard_rate',
-            'chargeoff_hazard_rate',
-            'forecast_flag'
-        ]
-        
-        return output_df[final_columns]
+        index = None
+        if isinstance(forecast, pd.DataFrame):
+            index = forecast.index
+            forecast = SegmentArrays.from_frame(forecast)
+        
+        balances = forecast.outstanding_balance
+        payments = forecast.payments
+        chargeoffs = forecast.chargeoffs
+        
+        # Hazard rates are reported as zero where there is no balance
+        inv_balance = forecast.inv_balance
+        inv_origination = 1.0 / origination_amount
+        
+        return pd.DataFrame({
+            'month_on_book': forecast.month_on_book,
+            'outstanding_balance_ratio': balances * inv_origination,
+            'payments_ratio': payments * inv_origination,
+            'chargeoffs_ratio': chargeoffs * inv_origination,
+            'payment_hazard_rate': payments * inv_balance,
+            'chargeoff_hazard_rate': chargeoffs * inv_balance,
+            'forecast_flag': forecast.forecast_flag
+        }, index=index)
     
     def save_output(self, output_df: pd.DataFrame, file_path: str, format: str = 'csv'):
         """Save formatted output to file."""
         if format.lower() == 'csv':
-            output_df.to_csv(file_path, index=False)
+            write_csv(output_df, file_path)
         elif format.lower() in ['excel', 'xlsx']:
-            output_df.to_excel(file_path, index=False)
+            if xlsxwriter is not None:
+                # constant_memory is not usable here: to_excel writes column by column,
+                # and constant_memory drops any row once a later row has been written
+                output_df.to_excel(file_path, index=False, engine='xlsxwriter')
+            else:
+                output_df.to_excel(file_path, index=False)
         else:
             raise ValueError(f"Unsupported format: {format}")
 
@@ -465,14 +892,17 @@ class SurvivalCreditModel:
             Training results and validation metrics
         """
         
+        # Work on column arrays from here on, converting the frame only once
+        data = self._as_segment_arrays(training_data)
+        
         # Validate input data
-        validation_results = self.validator.validate_data(training_data)
+        validation_results = self.validator.validate_data(data)
         
         if not validation_results['valid']:
             raise ValueError(f"Training data validation failed: {validation_results['errors']}")
         
         # Fit hazard rate curves
-        hazard_curves = self.rate_estimator.fit(training_data)
+        hazard_curves = self.rate_estimator.fit(data)
         
         self.is_trained = True
         
@@ -480,9 +910,9 @@ class SurvivalCreditModel:
             'validation_results': validation_results,
             'hazard_curves': hazard_curves,
             'training_summary': {
-                'segments_processed': training_data['segment_id'].nunique(),
-                'max_month': training_data['month_on_book'].max(),
-                'total_volume': training_data['outstanding_balance'].sum()
+                'segments_processed': len(pd.unique(data.segment_id)),
+                'max_month': data.month_on_book.max(),
+                'total_volume': data.outstanding_balance.sum()
             }
         }
     
@@ -503,25 +933,41 @@ class SurvivalCreditModel:
         if not self.is_trained:
             raise ValueError("Model must be trained before forecasting")
         
+        # Work on column arrays from here on, converting the frame only once;
+        # only the formatted output is a DataFrame
+        actuals = self._as_segment_arrays(known_actuals)
+        
         # Validate known actuals
-        validation_results = self.validator.validate_data(known_actuals)
+        validation_results = self.validator.validate_data(actuals)
         if not validation_results['valid']:
             raise ValueError(f"Known actuals validation failed: {validation_results['errors']}")
         
         # Validate against training curves
-        curve_validation = self.curve_engine.validate_known_actuals(known_actuals)
+        curve_validation = self.curve_engine.validate_known_actuals(actuals)
         
         # Generate forecast
-        forecast_df = self.forecast_generator.generate_forecast(known_actuals, max_month)
+        forecast = self.forecast_generator.generate_forecast(actuals, max_month)
         
         # Format output
-        formatted_output = self.output_formatter.format_curves_output(forecast_df, origination_amount)
+        formatted_output = self.output_formatter.format_curves_output(forecast, origination_amount)
         
         return formatted_output, {
             'data_validation': validation_results,
             'curve_validation': curve_validation
         }
     
+    @staticmethod
+    def _as_segment_arrays(data: pd.DataFrame) -> Union[pd.DataFrame, SegmentArrays]:
+        """
+        Convert to SegmentArrays if the required columns are present.
+        
+        Frames missing required columns are returned unchanged so that
+        validate_data reports them.
+        """
+        if set(DataValidator.REQUIRED_COLUMNS).issubset(data.columns):
+            return SegmentArrays.from_frame(data)
+        return data
+    
     def get_hazard_curves(self) -> Dict:
         """Get the trained hazard rate curves."""
         if not self.is_trained:
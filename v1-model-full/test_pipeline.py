@@ -3,16 +3,25 @@ Test the complete survival credit modeling pipeline with example data.
 Validates all components and demonstrates end-to-end workflow.
 """
 
+import argparse
+import os
+import tempfile
 import pandas as pd
 import numpy as np
-from survival_credit_model import SurvivalCreditModel
-from example_data_generator import generate_example_datasets
-import matplotlib.pyplot as plt
+from survival_credit_model import SurvivalCreditModel, OutputFormatter
+from example_data_generator import LoanDataGenerator, generate_example_datasets
 
 
-def test_full_pipeline():
+# Frames produced by test_full_pipeline, handed to create_visualization in memory
+pipeline_outputs = {}
+
+
+def test_full_pipeline(save_csv: bool = True):
     """
     Test the complete pipeline from data generation to forecasting.
+    
+    Args:
+        save_csv: Write forecast and hazard curve outputs to CSV files
     """
     
     print("=== Testing Survival Credit Modeling Pipeline ===\n")
@@ -78,32 +87,38 @@ def test_full_pipeline():
     # Step 4: Analyze results
     print("4. Analyzing forecast results...")
     
-    # Separate actual vs forecast
-    actuals = forecast_output[forecast_output['forecast_flag'] == 'Actual']
-    forecasts = forecast_output[forecast_output['forecast_flag'] == 'Forecast']
+    # Count actual vs forecast months
+    flag_counts = forecast_output['forecast_flag'].value_counts()
     
-    print(f"   ✓ Actual months: {len(actuals)}")
-    print(f"   ✓ Forecast months: {len(forecasts)}")
+    print(f"   ✓ Actual months: {flag_counts.get('Actual', 0)}")
+    print(f"   ✓ Forecast months: {flag_counts.get('Forecast', 0)}")
+    
+    # Pull each column once as an array for the summary and range checks
+    balance_ratio = forecast_output['outstanding_balance_ratio'].to_numpy()
+    payments_ratio = forecast_output['payments_ratio'].to_numpy()
+    chargeoffs_ratio = forecast_output['chargeoffs_ratio'].to_numpy()
+    payment_rates = forecast_output['payment_hazard_rate'].to_numpy()
+    chargeoff_rates = forecast_output['chargeoff_hazard_rate'].to_numpy()
     
     # Summary statistics
-    print(f"   ✓ Starting balance ratio: {forecast_output['outstanding_balance_ratio'].iloc[0]:.3f}")
-    print(f"   ✓ Final balance ratio: {forecast_output['outstanding_balance_ratio'].iloc[-1]:.3f}")
-    print(f"   ✓ Total payments ratio: {forecast_output['payments_ratio'].sum():.3f}")
-    print(f"   ✓ Total chargeoffs ratio: {forecast_output['chargeoffs_ratio'].sum():.3f}")
+    print(f"   ✓ Starting balance ratio: {balance_ratio[0]:.3f}")
+    print(f"   ✓ Final balance ratio: {balance_ratio[-1]:.3f}")
+    print(f"   ✓ Total payments ratio: {payments_ratio.sum():.3f}")
+    print(f"   ✓ Total chargeoffs ratio: {chargeoffs_ratio.sum():.3f}")
     
     # Check hazard rates are reasonable
-    payment_rates = forecast_output['payment_hazard_rate']
-    chargeoff_rates = forecast_output['chargeoff_hazard_rate']
+    payment_min, payment_max = payment_rates.min(), payment_rates.max()
+    chargeoff_min, chargeoff_max = chargeoff_rates.min(), chargeoff_rates.max()
     
-    print(f"   ✓ Payment hazard rates: {payment_rates.min():.4f} to {payment_rates.max():.4f}")
-    print(f"   ✓ Chargeoff hazard rates: {chargeoff_rates.min():.4f} to {chargeoff_rates.max():.4f}")
+    print(f"   ✓ Payment hazard rates: {payment_min:.4f} to {payment_max:.4f}")
+    print(f"   ✓ Chargeoff hazard rates: {chargeoff_min:.4f} to {chargeoff_max:.4f}")
     
     # Validate hazard rates are between 0-100%
-    if (payment_rates < 0).any() or (payment_rates > 1).any():
+    if payment_min < 0 or payment_max > 1:
         print("   ✗ Payment hazard rates outside valid range [0, 1]")
         return False
     
-    if (chargeoff_rates < 0).any() or (chargeoff_rates > 1).any():
+    if chargeoff_min < 0 or chargeoff_max > 1:
         print("   ✗ Chargeoff hazard rates outside valid range [0, 1]")
         return False
     
@@ -112,20 +127,29 @@ def test_full_pipeline():
     # Step 5: Save results
     print("5. Saving results...")
     try:
-        # Save forecast output
-        forecast_output.to_csv('forecast_output_test.csv', index=False)
-        print("   ✓ Forecast saved to 'forecast_output_test.csv'")
-        
-        # Save hazard curves for inspection
-        hazard_curves = model.get_hazard_curves()
+        # Hazard curves for inspection (reusing the curves fetched in step 2)
+        payment_hazard = hazard_curves['payment_hazard']
+        n_months = len(payment_hazard)
+        months = np.fromiter(payment_hazard.keys(), dtype=np.int32, count=n_months)
+        payment_curve = np.fromiter(payment_hazard.values(), dtype=np.float64, count=n_months)
+        chargeoff_curve = pd.Series(hazard_curves['chargeoff_hazard']).reindex(months, fill_value=0).to_numpy()
         curves_df = pd.DataFrame({
-            'month_on_book': list(hazard_curves['payment_hazard'].keys()),
-            'payment_hazard_rate': list(hazard_curves['payment_hazard'].values()),
-            'chargeoff_hazard_rate': [hazard_curves['chargeoff_hazard'].get(m, 0) 
-                                    for m in hazard_curves['payment_hazard'].keys()]
-        })
-        curves_df.to_csv('hazard_curves_test.csv', index=False)
-        print("   ✓ Hazard curves saved to 'hazard_curves_test.csv'\n")
+            'month_on_book': months,
+            'payment_hazard_rate': payment_curve,
+            'chargeoff_hazard_rate': chargeoff_curve
+        }, copy=False)
+        
+        pipeline_outputs['forecast_df'] = forecast_output
+        pipeline_outputs['curves_df'] = curves_df
+        
+        if save_csv:
+            forecast_output.to_csv('forecast_output_test.csv', index=False, lineterminator='\n')
+            print("   ✓ Forecast saved to 'forecast_output_test.csv'")
+            
+            curves_df.to_csv('hazard_curves_test.csv', index=False, lineterminator='\n')
+            print("   ✓ Hazard curves saved to 'hazard_curves_test.csv'\n")
+        else:
+            print("   ✓ CSV output skipped\n")
         
     except Exception as e:
         print(f"   ✗ Failed to save results: {e}")
@@ -202,50 +226,148 @@ def test_error_handling():
     return True
 
 
-def create_visualization():
+def test_batch_forecast():
+    """
+    Test that batch forecasting matches forecasting each segment on its own.
+    """
+    
+    print("\n=== Testing Batch Forecast ===\n")
+    
+    generator = LoanDataGenerator(random_seed=7)
+    model = SurvivalCreditModel()
+    model.train(generator.generate_training_data(max_months=48))
+    
+    # Segments with different last known months; the small one runs down to
+    # the 0.01 balance floor before max_month
+    max_month = 120
+    known_actuals = pd.concat([
+        generator.generate_test_data('Prime_Auto_2023Q1', known_months=12, origination_amount=8_000_000),
+        generator.generate_test_data('Subprime_Auto_2023Q2', known_months=5, origination_amount=3_000_000),
+        generator.generate_test_data('Near_Prime_Auto_2023Q3', known_months=24, origination_amount=50)
+    ], ignore_index=True)
+    
+    print("1. Forecasting segments in one batch...")
+    batch_forecast = model.forecast_generator.generate_forecast_batch(known_actuals, max_month)
+    
+    # Segment groups keep their labels from known_actuals, so most do not start at 0
+    segment_forecasts = [
+        model.forecast_generator.generate_forecast(segment_actuals, max_month)
+        for _, segment_actuals in known_actuals.groupby('segment_id', sort=False)
+    ]
+    
+    for forecast in [batch_forecast] + segment_forecasts:
+        if forecast.index.duplicated().any():
+            print("   ✗ Forecast output has duplicate index labels")
+            return False
+    
+    actual_labels = batch_forecast.index[batch_forecast['forecast_flag'] == 'Actual']
+    if sorted(actual_labels) != list(known_actuals.index):
+        print("   ✗ Actual rows lost their index labels")
+        return False
+    print("   ✓ Index labels are unique and actual rows keep their labels")
+    
+    expected = pd.concat(segment_forecasts, ignore_index=True)
+    
+    floor_segment = segment_forecasts[-1]
+    if floor_segment['month_on_book'].max() >= max_month:
+        print("   ✗ Expected the small segment to stop at the balance floor")
+        return False
+    print(f"   ✓ Small segment stops at month {floor_segment['month_on_book'].max()}")
+    
+    print("2. Comparing with per-segment forecasts...")
+    try:
+        pd.testing.assert_frame_equal(batch_forecast.reset_index(drop=True), expected,
+                                      check_dtype=False, rtol=1e-9)
+    except AssertionError as e:
+        print(f"   ✗ Batch forecast differs from per-segment forecasts: {str(e)[:80]}")
+        return False
+    print(f"   ✓ Batch forecast matches per-segment forecasts ({len(batch_forecast)} rows)")
+    
+    print("   ✓ Batch forecast tests passed\n")
+    return True
+
+
+def test_output_round_trip():
+    """
+    Test that saved CSV and Excel outputs read back with every cell intact.
+    """
+    
+    print("\n=== Testing Output Round Trip ===\n")
+    
+    formatter = OutputFormatter()
+    output_df = pd.DataFrame({
+        'month_on_book': np.arange(5),
+        'outstanding_balance_ratio': np.linspace(1.0, 0.6, 5),
+        'payments_ratio': np.linspace(0.08, 0.05, 5),
+        'forecast_flag': ['Actual', 'Actual', 'Forecast', 'Forecast', 'Forecast']
+    })
+    
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for i, (output_format, reader) in enumerate([('csv', pd.read_csv), ('xlsx', pd.read_excel)], start=1):
+            print(f"{i}. Testing {output_format} output...")
+            file_path = os.path.join(tmp_dir, f'round_trip.{output_format}')
+            formatter.save_output(output_df, file_path, format=output_format)
+            
+            try:
+                pd.testing.assert_frame_equal(reader(file_path), output_df, check_dtype=False)
+            except AssertionError as e:
+                print(f"   ✗ {output_format} output did not round trip: {str(e)[:80]}")
+                return False
+            print(f"   ✓ {output_format} output read back unchanged")
+    
+    print("   ✓ Output round trip tests passed\n")
+    return True
+
+
+def create_visualization(forecast_df: pd.DataFrame, curves_df: pd.DataFrame):
     """
     Create simple visualizations of the results (if matplotlib available).
+    
+    Args:
+        forecast_df: Forecast output from the pipeline
+        curves_df: Hazard curves from the pipeline
     """
     
     try:
-        # Read saved results
-        forecast_df = pd.read_csv('forecast_output_test.csv')
-        curves_df = pd.read_csv('hazard_curves_test.csv')
+        # Imported here so runs without visualization skip loading matplotlib;
+        # Agg avoids GUI backend setup since the figure is only saved to file
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
         
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(12, 8))
+        # Cumulative payments and chargeoffs
+        cum_payments, cum_chargeoffs = np.cumsum(
+            forecast_df[['payments_ratio', 'chargeoffs_ratio']].to_numpy(), axis=0
+        ).T
         
-        # Plot 1: Outstanding balance over time
-        ax1.plot(forecast_df['month_on_book'], forecast_df['outstanding_balance_ratio'])
-        ax1.set_title('Outstanding Balance Ratio Over Time')
-        ax1.set_xlabel('Month on Book')
-        ax1.set_ylabel('Balance Ratio')
-        ax1.grid(True, alpha=0.3)
+        forecast_months = forecast_df['month_on_book']
+        curve_months = curves_df['month_on_book']
         
-        # Plot 2: Cumulative payments and chargeoffs
-        forecast_df['cum_payments'] = forecast_df['payments_ratio'].cumsum()
-        forecast_df['cum_chargeoffs'] = forecast_df['chargeoffs_ratio'].cumsum()
+        # One (title, y-label, x, [(y, legend label), ...]) spec per panel
+        panels = [
+            ('Outstanding Balance Ratio Over Time', 'Balance Ratio', forecast_months,
+             [(forecast_df['outstanding_balance_ratio'], None)]),
+            ('Cumulative Payments and Chargeoffs', 'Cumulative Ratio', forecast_months,
+             [(cum_payments, 'Payments'), (cum_chargeoffs, 'Chargeoffs')]),
+            ('Payment Hazard Rate Curve', 'Payment Hazard Rate', curve_months,
+             [(curves_df['payment_hazard_rate'], None)]),
+            ('Chargeoff Hazard Rate Curve', 'Chargeoff Hazard Rate', curve_months,
+             [(curves_df['chargeoff_hazard_rate'], None)]),
+        ]
         
-        ax2.plot(forecast_df['month_on_book'], forecast_df['cum_payments'], label='Payments')
-        ax2.plot(forecast_df['month_on_book'], forecast_df['cum_chargeoffs'], label='Chargeoffs')
-        ax2.set_title('Cumulative Payments and Chargeoffs')
-        ax2.set_xlabel('Month on Book')
-        ax2.set_ylabel('Cumulative Ratio')
-        ax2.legend()
-        ax2.grid(True, alpha=0.3)
+        fig, axes = plt.subplots(2, 2, figsize=(12, 8), sharex=True)
         
-        # Plot 3: Payment hazard rates
-        ax3.plot(curves_df['month_on_book'], curves_df['payment_hazard_rate'])
-        ax3.set_title('Payment Hazard Rate Curve')
-        ax3.set_xlabel('Month on Book')
-        ax3.set_ylabel('Payment Hazard Rate')
-        ax3.grid(True, alpha=0.3)
+        for ax, (title, ylabel, x, series) in zip(axes.flat, panels):
+            for y, label in series:
+                ax.plot(x, y, label=label)
+            ax.set(title=title, ylabel=ylabel)
+            if len(series) > 1:
+                ax.legend()
+            ax.grid(True, alpha=0.3)
         
-        # Plot 4: Chargeoff hazard rates
-        ax4.plot(curves_df['month_on_book'], curves_df['chargeoff_hazard_rate'])
-        ax4.set_title('Chargeoff Hazard Rate Curve')
-        ax4.set_xlabel('Month on Book')
-        ax4.set_ylabel('Chargeoff Hazard Rate')
-        ax4.grid(True, alpha=0.3)
+        # The x axis is shared, so only the bottom row needs its label
+        for ax in axes[-1]:
+            ax.set_xlabel('Month on Book')
         
         plt.tight_layout()
         plt.savefig('survival_model_results.png', dpi=150, bbox_inches='tight')
@@ -258,15 +380,22 @@ def create_visualization():
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the survival credit modeling pipeline tests")
+    parser.add_argument('--no-csv', action='store_true',
+                        help="Skip writing forecast and hazard curve CSV files")
+    args = parser.parse_args()
+    
     # Run all tests
     success = True
     
-    success &= test_full_pipeline()
+    success &= test_full_pipeline(save_csv=not args.no_csv)
     success &= test_error_handling()
+    success &= test_batch_forecast()
+    success &= test_output_round_trip()
     
     if success:
         print("Creating visualization...")
-        create_visualization()
+        create_visualization(pipeline_outputs['forecast_df'], pipeline_outputs['curves_df'])
         print("\n🎉 All tests passed successfully!")
     else:
         print("\n❌ Some tests failed")
@@ -275,6 +404,7 @@ if __name__ == "__main__":
     print(f"\nFiles created:")
     print("- training_data_example.csv")
     print("- test_data_example.csv") 
-    print("- forecast_output_test.csv")
-    print("- hazard_curves_test.csv")
+    if not args.no_csv:
+        print("- forecast_output_test.csv")
+        print("- hazard_curves_test.csv")
     print("- survival_model_results.png (if matplotlib available)")
\ No newline at end of file
@@ -3,127 +3,147 @@
 
 import pandas as pd
 import numpy as np
-from openpyxl import Workbook
-from openpyxl.utils.dataframe import dataframe_to_rows
+import xlsxwriter
+
+# Formula templates, filled in per row with .format(r=row)
+COUNT_FMT = '=COUNTIFS(Raw_Data!$B:$B,A{r},Raw_Data!$H:$H,1)'
+PAY_RATE_FMT = '=IFERROR(SUMIFS(Raw_Data!$D:$D,Raw_Data!$B:$B,A{r},Raw_Data!$H:$H,1)/SUMIFS(Raw_Data!$C:$C,Raw_Data!$B:$B,A{r},Raw_Data!$H:$H,1),0)'
+CO_RATE_FMT = '=IFERROR(SUMIFS(Raw_Data!$E:$E,Raw_Data!$B:$B,A{r},Raw_Data!$H:$H,1)/SUMIFS(Raw_Data!$C:$C,Raw_Data!$B:$B,A{r},Raw_Data!$H:$H,1),0)'
+
+OUTPUT_PAY_FMT = '=C{r}*Forecast_Rates!B{r}'
+OUTPUT_CO_FMT = '=C{r}*Forecast_Rates!C{r}'
+OUTPUT_END_FMT = '=C{r}-D{r}-E{r}'
+OUTPUT_PAY_RATE_FMT = '=Forecast_Rates!B{r}'
+OUTPUT_CO_RATE_FMT = '=Forecast_Rates!C{r}'
 
 # Create sample historical data
 def create_sample_data():
     """Generate minimal sample data for 3 vintages"""
-    data = []
-    
     # 3 vintages, 24 months each
-    for vintage in ['2023-01', '2023-02', '2023-03']:
-        starting_bal = 1_000_000
-        
-        for month in range(1, 25):
-            # Simple declining rates
-            pay_rate = 0.02 * (1 - month * 0.002)  # Starts at 2%, declines
-            co_rate = 0.005 * (1 + month * 0.001)   # Starts at 0.5%, increases
-            
-            payment = starting_bal * pay_rate
-            chargeoff = starting_bal * co_rate
-            ending_bal = starting_bal - payment - chargeoff
-            
-            data.append({
-                'Vintage': vintage,
-                'Month_Age': month,
-                'Beginning_Balance': starting_bal,
-                'Payment_Amt': payment,
-                'Chargeoff_Amt': chargeoff,
-                'Ending_Balance': ending_bal,
-                'Loan_Count': 100,
-                'Is_Actual': 1
-            })
-            
-            starting_bal = ending_bal
-    
-    return pd.DataFrame(data)
+    vintages = ['2023-01', '2023-02', '2023-03']
+    n_months = 24
+    starting_bal = 1_000_000
+    
+    month = np.arange(1, n_months + 1)
+    
+    # Simple declining rates
+    pay_rate = 0.02 * (1 - month * 0.002)  # Starts at 2%, declines
+    co_rate = 0.005 * (1 + month * 0.001)   # Starts at 0.5%, increases
+    
+    # Every vintage follows the same curve, so take the balances once from
+    # the closed-form survival curve; each month begins at the prior ending balance
+    survive = np.cumprod(1 - pay_rate - co_rate)
+    ending_bal = starting_bal * survive
+    beginning_bal = np.concatenate(([starting_bal], ending_bal[:-1]))
+    payment = beginning_bal * pay_rate
+    chargeoff = beginning_bal * co_rate
+    
+    n_vintages = len(vintages)
+    return pd.DataFrame({
+        'Vintage': np.repeat(vintages, n_months),
+        'Month_Age': np.tile(month, n_vintages),
+        'Beginning_Balance': np.tile(beginning_bal, n_vintages),
+        'Payment_Amt': np.tile(payment, n_vintages),
+        'Chargeoff_Amt': np.tile(chargeoff, n_vintages),
+        'Ending_Balance': np.tile(ending_bal, n_vintages),
+        'Loan_Count': 100,
+        'Is_Actual': 1
+    })
 
 # Create the Excel model
 def create_excel_model():
-    wb = Workbook()
+    # Constant-memory mode flushes each row to disk once the next row starts,
+    # so every sheet is written strictly top to bottom
+    wb = xlsxwriter.Workbook(
+        '/mnt/c/Users/clays/OneDrive/Documents/Github/survival-credit-modeling/v2-model-full/survival_model_v2.xlsx',
+        {'constant_memory': True, 'strings_to_formulas': True}
+    )
     
     # 1. Raw_Data sheet
-    ws_raw = wb.active
-    ws_raw.title = "Raw_Data"
+    ws_raw = wb.add_worksheet("Raw_Data")
     df_raw = create_sample_data()
     
-    for r in dataframe_to_rows(df_raw, index=False, header=True):
-        ws_raw.append(r)
+    ws_raw.write_row(0, 0, df_raw.columns)
+    for r, values in enumerate(df_raw.itertuples(index=False, name=None), start=1):
+        ws_raw.write_row(r, 0, values)
     
     # 2. Rate_Analysis sheet
-    ws_rates = wb.create_sheet("Rate_Analysis")
-    ws_rates.append(['Month_Age', 'Vintage_Count', 'Payment_Rate', 'CO_Rate'])
+    ws_rates = wb.add_worksheet("Rate_Analysis")
+    ws_rates.write_row(0, 0, ('Month_Age', 'Vintage_Count', 'Payment_Rate', 'CO_Rate'))
     
     for month in range(1, 25):
         row = month + 1
-        ws_rates.append([
+        ws_rates.write_row(month, 0, (
             month,
-            f'=COUNTIFS(Raw_Data!$B:$B,A{row},Raw_Data!$H:$H,1)',
-            f'=IFERROR(SUMIFS(Raw_Data!$D:$D,Raw_Data!$B:$B,A{row},Raw_Data!$H:$H,1)/SUMIFS(Raw_Data!$C:$C,Raw_Data!$B:$B,A{row},Raw_Data!$H:$H,1),0)',
-            f'=IFERROR(SUMIFS(Raw_Data!$E:$E,Raw_Data!$B:$B,A{row},Raw_Data!$H:$H,1)/SUMIFS(Raw_Data!$C:$C,Raw_Data!$B:$B,A{row},Raw_Data!$H:$H,1),0)'
-        ])
+            COUNT_FMT.format(r=row),
+            PAY_RATE_FMT.format(r=row),
+            CO_RATE_FMT.format(r=row)
+        ))
     
     # 3. Forecast_Rates sheet (extends to month 144)
-    ws_forecast = wb.create_sheet("Forecast_Rates")
-    ws_forecast.append(['Month_Age', 'Payment_Rate', 'CO_Rate', 'Source'])
+    ws_forecast = wb.add_worksheet("Forecast_Rates")
+    ws_forecast.write_row(0, 0, ('Month_Age', 'Payment_Rate', 'CO_Rate', 'Source'))
     
     # First 24 months from historical
     for month in range(1, 25):
         row = month + 1
-        ws_forecast.append([
+        ws_forecast.write_row(month, 0, (
             month,
             f'=Rate_Analysis!C{row}',
             f'=Rate_Analysis!D{row}',
             'Historical'
-        ])
+        ))
+    
+    # Months 25-144 with decay, multipliers precomputed so Excel only scales month 24
+    decay_factor = np.round(np.arange(1, 121) / 12, 2)
+    pay_decay = np.power(0.95, decay_factor)
+    co_decay = np.power(0.90, decay_factor)
     
-    # Months 25-144 with decay
     for month in range(25, 145):
-        row = month + 1
-        decay_factor = (month - 24) / 12
-        ws_forecast.append([
+        ws_forecast.write_row(month, 0, (
             month,
-            f'=B25*0.95^{decay_factor:.2f}',
-            f'=C25*0.90^{decay_factor:.2f}',
+            f'=$B$25*{pay_decay[month - 25]:.6g}',
+            f'=$C$25*{co_decay[month - 25]:.6g}',
             'Extended'
-        ])
+        ))
     
     # 4. Forecast_Output sheet (for new vintage 2025-01)
-    ws_output = wb.create_sheet("Forecast_Output")
-    ws_output.append(['Vintage', 'Month_Age', 'Beginning_Bal', 'Payment_Amt', 'CO_Amt', 'Ending_Bal', 'Payment_Rate', 'CO_Rate'])
+    ws_output = wb.add_worksheet("Forecast_Output")
+    ws_output.write_row(0, 0, ('Vintage', 'Month_Age', 'Beginning_Bal', 'Payment_Amt', 'CO_Amt', 'Ending_Bal', 'Payment_Rate', 'CO_Rate'))
     
     # Starting balance
     starting_balance = 1_000_000
     
-    # First row
-    ws_output.append([
+    # Build every row up front: the first row seeds the balance, the rest chain from the previous ending balance
+    output_rows = [(
         '2025-01',
         1,
         starting_balance,
-        f'=C2*Forecast_Rates!B2',
-        f'=C2*Forecast_Rates!C2',
-        f'=C2-D2-E2',
-        f'=Forecast_Rates!B2',
-        f'=Forecast_Rates!C2'
-    ])
-    
-    # Remaining rows
-    for month in range(2, 145):
-        row = month + 1
-        ws_output.append([
+        OUTPUT_PAY_FMT.format(r=2),
+        OUTPUT_CO_FMT.format(r=2),
+        OUTPUT_END_FMT.format(r=2),
+        OUTPUT_PAY_RATE_FMT.format(r=2),
+        OUTPUT_CO_RATE_FMT.format(r=2)
+    )]
+    output_rows.extend(
+        (
             '2025-01',
             month,
-            f'=F{row-1}',  # Beginning = Previous Ending
-            f'=C{row}*Forecast_Rates!B{month+1}',
-            f'=C{row}*Forecast_Rates!C{month+1}',
-            f'=C{row}-D{row}-E{row}',
-            f'=Forecast_Rates!B{month+1}',
-            f'=Forecast_Rates!C{month+1}'
-        ])
+            f'=F{month}',  # Beginning = Previous Ending
+            OUTPUT_PAY_FMT.format(r=month + 1),
+            OUTPUT_CO_FMT.format(r=month + 1),
+            OUTPUT_END_FMT.format(r=month + 1),
+            OUTPUT_PAY_RATE_FMT.format(r=month + 1),
+            OUTPUT_CO_RATE_FMT.format(r=month + 1)
+        )
+        for month in range(2, 145)
+    )
+    
+    for r, output_row in enumerate(output_rows, start=1):
+        ws_output.write_row(r, 0, output_row)
     
     # Save the file
-    wb.save('/mnt/c/Users/clays/OneDrive/Documents/Github/survival-credit-modeling/v2-model-full/survival_model_v2.xlsx')
+    wb.close()
     print("Excel model created: survival_model_v2.xlsx")
     print("\nModel structure:")
     print("- Raw_Data: Sample historical data (3 vintages x 24 months)")